@@ -0,0 +1,536 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from metaphors.applications.bionic_reading.features.bionic_reading import BionicReading
+from metaphors.applications.bionic_reading.settings import OutputFormat, RareBehavior, StopWordsBehavior
+
+
+MANIFEST_NAME = ".manifest.jsonl"
+
+# (key, input path or None, text or None, input hash, output path, size, mtime_ns)
+Job = Tuple[str, Optional[str], Optional[str], str, str, int, int]
+# (key, error message)
+Failure = Tuple[str, str]
+
+_renderer: Optional[BionicReading] = None
+
+
+def hash_text(text: str) -> str:
+    """
+    It computes the sha256 of a text
+
+    :param text: The text to hash
+    :type text: str
+    :return: The hexadecimal digest.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_config(config: Dict[str, Any]) -> str:
+    """
+    It computes the sha256 of the BionicReading parameters, any change of parameter invalidates the outputs
+
+    :param config: The parameters given to BionicReading
+    :type config: Dict[str, Any]
+    :return: The hexadecimal digest.
+    """
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def write_atomic(path: str, data: str):
+    """
+    It writes a file through a temporary file of the same directory renamed at the end, so the file is either complete
+    or absent, even if the job is killed
+
+    :param path: The path of the file to write
+    :type path: str
+    :param data: The content of the file
+    :type data: str
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class Manifest:
+    """
+    Append-only record of the rendered inputs: input key -> input hash, config hash, output. An entry is written as
+    soon as its output is, so an interrupted job resumes after the last rendered input.
+    """
+
+    def __init__(self, path: str):
+        """
+        Inits Manifest
+
+        :param path: The path of the manifest, created if it doesn't exist
+        :type path: str
+        """
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # last line of a killed job
+                        continue
+                    self.entries[entry["key"]] = entry
+        self._file = None
+
+    def known_hash(self, key: str, size: int, mtime_ns: int) -> Optional[str]:
+        """
+        It returns the recorded hash of an input file whose size and modification time didn't change, so unchanged
+        files are not read again
+
+        :param key: The key of the input
+        :type key: str
+        :param size: The current size of the file
+        :type size: int
+        :param mtime_ns: The current modification time of the file
+        :type mtime_ns: int
+        :return: The input hash or None.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+            return entry["input_hash"]
+
+        return None
+
+    def is_fresh(self, key: str, input_hash: str, config_hash: str) -> bool:
+        """
+        It checks whether the input was already rendered with the same content and parameters
+
+        :param key: The key of the input
+        :type key: str
+        :param input_hash: The hash of the input content
+        :type input_hash: str
+        :param config_hash: The hash of the parameters
+        :type config_hash: str
+        :return: True if the output is up to date.
+        """
+        entry = self.entries.get(key)
+
+        return (
+            entry is not None
+            and entry["input_hash"] == input_hash
+            and entry["config_hash"] == config_hash
+            and os.path.exists(entry["output"])
+        )
+
+    def record(self, key: str, **entry: Any):
+        """
+        It appends an entry to the manifest and flushes it
+
+        :param key: The key of the input
+        :type key: str
+        :param entry: The input hash, config hash, output, size and mtime_ns of the input
+        :type entry: Any
+        """
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self.entries[key] = {"key": key, **entry}
+        self._file.write(json.dumps(self.entries[key]) + "\n")
+        self._file.flush()
+
+    def compact(self):
+        """
+        It rewrites the manifest with a single entry per input
+        """
+        self.close()
+        write_atomic(self.path, "".join(json.dumps(entry) + "\n" for entry in self.entries.values()))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Progress:
+    """Prints the throughput and the ETA of the job on stderr, at most once per interval."""
+
+    def __init__(self, total: Optional[int], interval: float = 1.0):
+        """
+        Inits Progress
+
+        :param total: The number of inputs, None if unknown. The skipped and failed inputs are not counted in the ETA
+        :type total: int
+        :param interval: Minimum number of seconds between two prints
+        :type interval: float
+        """
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.n_bytes = 0
+        self.start = time.monotonic()
+        self._last = 0.0
+
+    def update(self, n_bytes: int, force: bool = False):
+        """
+        It counts a rendered input and prints the progress
+
+        :param n_bytes: The size of the rendered input
+        :type n_bytes: int
+        :param force: Print even if the interval didn't elapse
+        :type force: bool
+        """
+        self.done += 1
+        self.n_bytes += n_bytes
+        self.print(force)
+
+    def print(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = max(now - self.start, 1e-9)
+        rate = self.done / elapsed
+        message = f"{self.done}" + (f"/{self.total}" if self.total is not None else "") + " rendered"
+        message += f", {rate:.1f} docs/s, {self.n_bytes / elapsed / 1e6:.2f} MB/s"
+        if self.total is not None and rate > 0:
+            remaining = max(self.total - self.done - self.skipped - self.failed, 0)
+            message += f", ETA {remaining / rate:.0f}s"
+        print(message, file=sys.stderr)
+
+
+def _init_worker(config: Dict[str, Any]):
+    """
+    It builds the BionicReading of a worker process once
+
+    :param config: The parameters given to BionicReading
+    :type config: Dict[str, Any]
+    """
+    global _renderer
+    _renderer = BionicReading(**config)
+
+
+def _render(job: Job) -> Job:
+    """
+    It renders a single input and writes its output atomically, in a worker process
+
+    :param job: The input to render
+    :type job: Job
+    :return: The job, to record it in the manifest.
+    """
+    key, path, text, input_hash, output, size, mtime_ns = job
+    if text is None:
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+    assert _renderer is not None
+    write_atomic(output, _renderer.read_faster(text))
+
+    return key, path, None, input_hash, output, size, mtime_ns
+
+
+def iter_directory_files(input_path: str, pattern: str) -> Iterator[Tuple[str, str]]:
+    """
+    It lists the files of a directory tree in a stable order
+
+    :param input_path: The directory to list
+    :type input_path: str
+    :param pattern: Only the files ending with this suffix are listed
+    :type pattern: str
+    :return: An iterator of (path, key relative to the directory).
+    """
+    for root, directories, filenames in os.walk(input_path):
+        directories.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(pattern):
+                path = os.path.join(root, filename)
+                yield path, os.path.relpath(path, input_path)
+
+
+def count_inputs(input_path: str, pattern: str) -> Optional[int]:
+    """
+    It counts the inputs before rendering them, for the ETA: the matching files of a directory or the non empty lines
+    of a JSONL file. A stream on stdin can't be read twice, its total is unknown
+
+    :param input_path: The directory or JSONL file to render, "-" for stdin
+    :type input_path: str
+    :param pattern: Only the files ending with this suffix are counted, for a directory
+    :type pattern: str
+    :return: The number of inputs, or None for stdin.
+    """
+    if input_path == "-":
+        return None
+    if os.path.isdir(input_path):
+        return sum(1 for _ in iter_directory_files(input_path, pattern))
+    with open(input_path, "rb") as file:
+        return sum(1 for line in file if line.strip())
+
+
+def iter_directory_jobs(
+    input_path: str, output_path: str, extension: str, manifest: Manifest, pattern: str, failures: List[Failure]
+) -> Iterator[Job]:
+    """
+    It lists the files of a directory tree, the output mirrors the tree with the extension of the output format
+
+    :param input_path: The directory to render
+    :type input_path: str
+    :param output_path: The directory of the outputs
+    :type output_path: str
+    :param extension: The extension of the outputs
+    :type extension: str
+    :param manifest: The manifest, used to avoid hashing the files which didn't change
+    :type manifest: Manifest
+    :param pattern: Only the files ending with this suffix are rendered
+    :type pattern: str
+    :param failures: The list the files which can't be read are appended to
+    :type failures: List[Failure]
+    :return: An iterator of jobs.
+    """
+    for path, key in iter_directory_files(input_path, pattern):
+        try:
+            stat = os.stat(path)
+            input_hash = manifest.known_hash(key, stat.st_size, stat.st_mtime_ns)
+            if input_hash is None:
+                with open(path, "rb") as file:
+                    input_hash = hashlib.sha256(file.read()).hexdigest()
+        except OSError as error:
+            failures.append((key, repr(error)))
+            continue
+        output = os.path.join(output_path, os.path.splitext(key)[0] + extension)
+        yield key, path, None, input_hash, output, stat.st_size, stat.st_mtime_ns
+
+
+def check_id(key: str):
+    """
+    It checks that the id of a record can be used as a file name inside the output directory
+
+    :param key: The id of the record
+    :type key: str
+    """
+    assert key, "the id is empty"
+    assert not any(separator in key for separator in ("/", "\\", os.sep, "\0")), "the id contains a path separator"
+    assert ".." not in key, "the id contains '..'"
+    assert not key.startswith("."), "the id starts with '.'"
+
+
+def iter_jsonl_jobs(
+    input_path: str, output_path: str, extension: str, id_field: str, text_field: str, failures: List[Failure]
+) -> Iterator[Job]:
+    """
+    It streams the records of a JSONL file (or stdin with "-"), each record gives an output named after its id. The
+    records which can't be parsed, whose id can't be used as a file name or was already seen are appended to the
+    failures
+
+    :param input_path: The JSONL file to render, "-" for stdin
+    :type input_path: str
+    :param output_path: The directory of the outputs
+    :type output_path: str
+    :param extension: The extension of the outputs
+    :type extension: str
+    :param id_field: The field of the record holding its id
+    :type id_field: str
+    :param text_field: The field of the record holding the text to render
+    :type text_field: str
+    :param failures: The list the invalid records are appended to, keyed by id or line number
+    :type failures: List[Failure]
+    :return: An iterator of jobs.
+    """
+    seen = set()
+    file = sys.stdin.buffer if input_path == "-" else open(input_path, "rb")
+    try:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            key = f"line {line_number}"
+            try:
+                record = json.loads(line.decode("utf-8"))
+                key, text = str(record[id_field]), record[text_field]
+                assert isinstance(text, str), f"the field {text_field} is not a string"
+                check_id(key)
+                assert key not in seen, "the id is duplicated"
+            except (ValueError, KeyError, TypeError, AssertionError) as error:
+                failures.append((key, repr(error)))
+                continue
+            seen.add(key)
+            output = os.path.join(output_path, key + extension)
+            yield key, None, text, hash_text(text), output, len(text), 0
+    finally:
+        if file is not sys.stdin.buffer:
+            file.close()
+
+
+def _record(
+    futures: Any,
+    running: Dict[Future, str],
+    manifest: Manifest,
+    config_hash: str,
+    progress: Progress,
+    failures: List[Failure],
+):
+    """
+    It records the completed jobs in the manifest, the jobs which raised are appended to the failures and are not
+    recorded, so they are rendered again by the next run
+
+    :param futures: The completed futures
+    :type futures: Any
+    :param running: The key of each running future, the completed ones are removed
+    :type running: Dict[Future, str]
+    :param manifest: The manifest to update
+    :type manifest: Manifest
+    :param config_hash: The hash of the parameters
+    :type config_hash: str
+    :param progress: The progress to update
+    :type progress: Progress
+    :param failures: The list the failed jobs are appended to
+    :type failures: List[Failure]
+    """
+    for future in futures:
+        key = running.pop(future)
+        error = future.exception()
+        if error is not None:
+            failures.append((key, repr(error)))
+            # the inputs which failed while listing are in the failures too
+            progress.failed = len(failures)
+            continue
+        key, _, _, input_hash, output, size, mtime_ns = future.result()
+        manifest.record(
+            key, input_hash=input_hash, config_hash=config_hash, output=output, size=size, mtime_ns=mtime_ns
+        )
+        progress.update(size)
+
+
+def bulk_render(
+    input_path: str,
+    output_path: str,
+    config: Dict[str, Any],
+    workers: int = os.cpu_count() or 1,
+    pattern: str = ".txt",
+    id_field: str = "id",
+    text_field: str = "text",
+) -> Dict[str, Any]:
+    """
+    It renders a directory tree or a JSONL file with a pool of processes, skipping the inputs whose content and
+    parameters didn't change since the last run according to the manifest of the output directory. The inputs are
+    submitted as they are listed, at most 4 per worker at a time, and an input which fails doesn't stop the run
+
+    :param input_path: The directory or JSONL file to render, "-" for a JSONL stream on stdin
+    :type input_path: str
+    :param output_path: The directory of the outputs and of the manifest
+    :type output_path: str
+    :param config: The parameters given to BionicReading
+    :type config: Dict[str, Any]
+    :param workers: The number of processes
+    :type workers: int
+    :param pattern: Only the files ending with this suffix are rendered, for a directory
+    :type pattern: str
+    :param id_field: The field of the record holding its id, for a JSONL file
+    :type id_field: str
+    :param text_field: The field of the record holding the text, for a JSONL file
+    :type text_field: str
+    :return: The number of rendered and skipped inputs, and the (key, error) of the failed ones.
+    """
+    assert workers > 0, "please enter a number of workers greater than 0"
+    os.makedirs(output_path, exist_ok=True)
+    manifest = Manifest(os.path.join(output_path, MANIFEST_NAME))
+    config_hash = hash_config(config)
+    extension = ".html" if config.get("output_format") == OutputFormat.HTML.value else ".txt"
+    failures: List[Failure] = []
+    if os.path.isdir(input_path):
+        jobs = iter_directory_jobs(input_path, output_path, extension, manifest, pattern, failures)
+    else:
+        jobs = iter_jsonl_jobs(input_path, output_path, extension, id_field, text_field, failures)
+    progress = Progress(count_inputs(input_path, pattern))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as executor:
+        running: Dict[Future, str] = {}
+        for job in jobs:
+            key, path, text, input_hash, output, size, mtime_ns = job
+            if manifest.is_fresh(key, input_hash, config_hash):
+                progress.skipped += 1
+                if path is not None and manifest.known_hash(key, size, mtime_ns) is None:
+                    # same content with a new modification time, no need to hash it next time
+                    manifest.record(
+                        key, input_hash=input_hash, config_hash=config_hash, output=output, size=size, mtime_ns=mtime_ns
+                    )
+                continue
+            running[executor.submit(_render, job)] = key
+            if len(running) >= 4 * workers:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                _record(done, running, manifest, config_hash, progress, failures)
+        done, _ = wait(running)
+        _record(done, running, manifest, config_hash, progress, failures)
+    progress.failed = len(failures)
+    progress.print(force=True)
+    manifest.compact()
+
+    return {"rendered": progress.done, "skipped": progress.skipped, "failures": failures}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    The entry point of the `metaphors-bionic` command
+
+    :param argv: The command line arguments, defaults to sys.argv
+    :type argv: List[str]
+    :return: The exit code.
+    """
+    parser = argparse.ArgumentParser(prog="metaphors-bionic", description="Render a corpus with Bionic Reading.")
+    parser.add_argument("input", help="directory tree, JSONL file, or - for a JSONL stream on stdin")
+    parser.add_argument("output", help="output directory, holds the manifest")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pattern", default=".txt", help="suffix of the files to render in a directory")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--fixation", type=float, default=0.6)
+    parser.add_argument("--saccades", type=float, default=0.75)
+    parser.add_argument("--opacity", type=float, default=0.75)
+    parser.add_argument("--stopwords", type=float, default=0.25)
+    parser.add_argument(
+        "--stopwords-behavior",
+        default=StopWordsBehavior.STRIKETHROUGH.value,
+        choices=[behavior.value for behavior in StopWordsBehavior],
+    )
+    parser.add_argument(
+        "--output-format", default=OutputFormat.HTML.value, choices=[output.value for output in OutputFormat]
+    )
+    parser.add_argument(
+        "--rare-words-behavior",
+        default=RareBehavior.UNDERLINE.value,
+        choices=[behavior.value for behavior in RareBehavior],
+    )
+    parser.add_argument("--rare-words-max-freq", type=int, default=5)
+    parser.add_argument("--compact", action="store_true")
+    args = parser.parse_args(argv)
+    config = {
+        "fixation": args.fixation,
+        "saccades": args.saccades,
+        "opacity": args.opacity,
+        "stopwords": args.stopwords,
+        "stopwords_behavior": args.stopwords_behavior,
+        "output_format": args.output_format,
+        "rare_words_behavior": args.rare_words_behavior,
+        "rare_words_max_freq": args.rare_words_max_freq,
+        "compact": args.compact,
+    }
+    stats = bulk_render(args.input, args.output, config, args.workers, args.pattern, args.id_field, args.text_field)
+    print(f"{stats['rendered']} rendered, {stats['skipped']} unchanged", file=sys.stderr)
+    if stats["failures"]:
+        print(f"{len(stats['failures'])} failed:", file=sys.stderr)
+        for key, error in stats["failures"]:
+            print(f"  {key}: {error}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
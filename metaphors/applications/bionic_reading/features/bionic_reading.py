@@ -1,14 +1,19 @@
 import re
 import string
-import pandas as pd
+import importlib.util
 
-from typing import List, Tuple
+from collections import Counter
+from typing import Iterator, List, Optional, Tuple
 from sklearn.feature_extraction.text import CountVectorizer
 
 from metaphors.data import stopwords_set
-from metaphors.utils.string_utils import string_contains_digit, strike_string
-from metaphors.applications.bionic_reading.settings import RareBehavior, Format
+from metaphors.utils.string_utils import string_contains_digit, strike_string, compress_string
+from metaphors.applications.bionic_reading.models.predict import FixationTable
+from metaphors.applications.bionic_reading.utils.budget import BUDGET_METRICS, Deadline
+from metaphors.applications.bionic_reading.settings import RareBehavior, Format, Compression
+from metaphors.applications.bionic_reading.settings import COMPACT_HTML_TAGS, COMPACT_ANSI_CODES, COMPACT_ANSI_RESET
 from metaphors.applications.bionic_reading.settings import SIMPLE_SPLITTER, OutputFormat, StopWordsBehavior
+from metaphors.applications.bionic_reading.settings import WORDS_PER_PAGE, BUDGET_CHECK_TOKENS, BUDGET_CHECK_CHARS
 
 
 class BionicReading:
@@ -24,6 +29,11 @@ class BionicReading:
         output_format: str = OutputFormat.HTML.value,
         rare_words_behavior: str = RareBehavior.UNDERLINE.value,
         rare_words_max_freq: int = 5,
+        fixation_table: Optional[FixationTable] = None,
+        compact: bool = False,
+        max_chars: Optional[int] = None,
+        rare_words_max_chars: Optional[int] = None,
+        time_budget: Optional[float] = None,
     ):
         """
         Inits BionicReading
@@ -44,6 +54,17 @@ class BionicReading:
         :type rare_words_behavior: str
         :param rare_words_max_freq: Max frequency word to be considered as rare
         :type rare_words_max_freq: int
+        :param fixation_table: Learned cut point per word, replaces the fixation ratio when defined
+        :type fixation_table: FixationTable
+        :param compact: Use one letter tags (html) or style specific escape codes (python) and merge adjacent runs of the
+        same style, to reduce the size of the output
+        :type compact: bool
+        :param max_chars: Only the first characters of the text are rendered, the rest is appended unrendered
+        :type max_chars: int
+        :param rare_words_max_chars: The rare words are not analysed on longer texts
+        :type rare_words_max_chars: int
+        :param time_budget: Number of seconds of a call after which the rest of the text is appended unrendered
+        :type time_budget: float
         """
         self.fixation = fixation
         self.saccades = saccades
@@ -53,6 +74,11 @@ class BionicReading:
         self.stopwords_behavior = stopwords_behavior
         self.rare_words_behavior = rare_words_behavior
         self.rare_words_max_freq = rare_words_max_freq
+        self.fixation_table = fixation_table
+        self.compact = compact
+        self.max_chars = max_chars
+        self.rare_words_max_chars = rare_words_max_chars
+        self.time_budget = time_budget
         self.non_tokens = string.punctuation + " \n\t"
         self.highlight = "\033[93m"
         self.underline = "\033[4m"
@@ -293,23 +319,184 @@ class BionicReading:
         """
         del self._rare_words_max_freq
 
-    def get_rare_words(self, text: str) -> List[str]:
+    @property
+    def fixation_table(self):
+        """
+        It returns the learned fixation table of the object.
+        :return: The fixation table, or None if the fixation ratio is used.
+        """
+        return self._fixation_table
+
+    @fixation_table.setter
+    def fixation_table(self, value: Optional[FixationTable]):
+        """
+        This function takes a FixationTable, or None to use the fixation ratio, and sets the fixation_table attribute
+
+        :param value: The table loaded with `load_fixation_table`
+        :type value: FixationTable
+        """
+        assert value is None or isinstance(value, FixationTable), "please use a FixationTable fixation_table type"
+        self._fixation_table = value
+
+    @fixation_table.deleter
+    def fixation_table(self):
+        """
+        It deletes the fixation_table attribute of the object.
+        """
+        del self._fixation_table
+
+    @property
+    def compact(self):
+        """
+        It returns whether the output is compact.
+        :return: The compact flag.
+        """
+        return self._compact
+
+    @compact.setter
+    def compact(self, value: bool):
+        """
+        This function takes a boolean value and sets the compact attribute
+
+        :param value: Whether the output is compact
+        :type value: bool
+        """
+        assert isinstance(value, bool), "please use a compact bool type"
+        self._compact = value
+
+    @compact.deleter
+    def compact(self):
+        """
+        It deletes the compact attribute of the object.
+        """
+        del self._compact
+
+    @property
+    def max_chars(self):
+        """
+        It returns the maximum number of characters rendered by a call.
+        :return: The max_chars, or None if there is no limit.
+        """
+        return self._max_chars
+
+    @max_chars.setter
+    def max_chars(self, value: Optional[int]):
         """
-        Takes a string of text, and returns a list of words that appear more than a certain number of times in the text
+        This function takes a positive integer, or None for no limit, and sets the max_chars attribute
+
+        :param value: The maximum number of characters rendered
+        :type value: int
+        """
+        assert value is None or isinstance(value, int), "please use a max_chars int type"
+        assert value is None or value > 0, "please enter a max_chars greater than 0"
+        self._max_chars = value
+
+    @max_chars.deleter
+    def max_chars(self):
+        """
+        It deletes the max_chars attribute of the object.
+        """
+        del self._max_chars
+
+    @property
+    def rare_words_max_chars(self):
+        """
+        It returns the maximum number of characters of a text whose rare words are analysed.
+        :return: The rare_words_max_chars, or None if there is no limit.
+        """
+        return self._rare_words_max_chars
+
+    @rare_words_max_chars.setter
+    def rare_words_max_chars(self, value: Optional[int]):
+        """
+        This function takes a positive integer, or None for no limit, and sets the rare_words_max_chars attribute
+
+        :param value: The maximum number of characters of a text whose rare words are analysed
+        :type value: int
+        """
+        assert value is None or isinstance(value, int), "please use a rare_words_max_chars int type"
+        assert value is None or value > 0, "please enter a rare_words_max_chars greater than 0"
+        self._rare_words_max_chars = value
+
+    @rare_words_max_chars.deleter
+    def rare_words_max_chars(self):
+        """
+        It deletes the rare_words_max_chars attribute of the object.
+        """
+        del self._rare_words_max_chars
+
+    @property
+    def time_budget(self):
+        """
+        It returns the time budget of a call.
+        :return: The time_budget in seconds, or None if there is no limit.
+        """
+        return self._time_budget
+
+    @time_budget.setter
+    def time_budget(self, value: Optional[float]):
+        """
+        This function takes a number of seconds, or None for no limit, and sets the time_budget attribute
+
+        :param value: The time budget of a call in seconds
+        :type value: float
+        """
+        assert value is None or isinstance(value, (int, float)), "please use a time_budget float type"
+        assert value is None or value >= 0, "please enter a time_budget greater than or equal to 0"
+        self._time_budget = value
+
+    @time_budget.deleter
+    def time_budget(self):
+        """
+        It deletes the time_budget attribute of the object.
+        """
+        del self._time_budget
+
+    def get_rare_words(self, text: str, deadline: Optional[Deadline] = None) -> Optional[List[str]]:
+        """
+        Takes a string of text, and returns a list of words that appear more than a certain number of times in the text.
+        The words are counted BUDGET_CHECK_CHARS characters at a time, the deadline is checked between two chunks
 
         :param text: The text to be analyzed
         :type text: str
-        :return: A list of uncommon words
-        """
-        vectorizer = CountVectorizer(stop_words=stopwords_set.STRONG_STOPWORDS_SET)
-        transformed = vectorizer.fit_transform([text])
-        data = pd.DataFrame(transformed.toarray(), columns=vectorizer.get_feature_names_out()).T
-        data.columns = ["freq"]
-        uncommon_words = data[data["freq"] <= self.rare_words_max_freq].index.tolist()
-        uncommon_words = [word for word in uncommon_words if not string_contains_digit(word)]
+        :param deadline: The end of the time budget, defaults to None
+        :type deadline: Deadline (optional)
+        :return: A list of uncommon words, or None if the deadline is over before all the words are counted
+        """
+        analyzer = CountVectorizer(stop_words=stopwords_set.STRONG_STOPWORDS_SET).build_analyzer()
+        counts: Counter = Counter()
+        for chunk in self.split_text_to_chunks(text):
+            if deadline is not None and deadline.expired():
+                return None
+            counts.update(analyzer(chunk))
+        uncommon_words = sorted(
+            word
+            for word, count in counts.items()
+            if count <= self.rare_words_max_freq and not string_contains_digit(word)
+        )
 
         return uncommon_words
 
+    @staticmethod
+    def split_text_to_chunks(text: str, chunk_chars: int = BUDGET_CHECK_CHARS) -> Iterator[str]:
+        """
+        It splits a string into chunks of about `chunk_chars` characters, ending after a whitespace so no word is split
+        between two chunks, unless a chunk has no whitespace at all
+
+        :param text: The text to split into chunks
+        :type text: str
+        :param chunk_chars: The maximum number of characters of a chunk
+        :type chunk_chars: int
+        :return: An iterator of chunks, joining them gives back the text
+        """
+        start = 0
+        while start < len(text):
+            end = start + chunk_chars
+            if end < len(text):
+                end = max(text.rfind(" ", start, end), text.rfind("\n", start, end)) + 1 or end
+            yield text[start:end]
+            start = end
+
     @staticmethod
     def split_text_to_words(text: str) -> List[str]:
         """
@@ -323,6 +510,41 @@ class BionicReading:
 
         return [token for token in tokens if len(token) > 0]
 
+    @staticmethod
+    def split_text_to_pages(text: str, words_per_page: int = WORDS_PER_PAGE) -> List[str]:
+        """
+        It splits a string into pages of about `words_per_page` words, at the end of a line so the paragraphs are kept
+        whole when possible, and at a whitespace inside the lines longer than a page. Joining the pages gives back the
+        text
+
+        :param text: The text to split into pages
+        :type text: str
+        :param words_per_page: The number of words after which a page ends, at the next end of line
+        :type words_per_page: int
+        :return: A list of pages
+        """
+        assert words_per_page > 0, "please enter a words_per_page greater than 0"
+        pages, pieces, n_words = [], [], 0
+        for line in text.splitlines(keepends=True):
+            n_line_words = len(line.split())
+            if n_line_words <= words_per_page:
+                units = [(line, n_line_words)]
+            else:
+                stripped = line.lstrip()
+                words = re.findall(r"\S+\s*", stripped)
+                words[0] = line[: len(line) - len(stripped)] + words[0]
+                units = [(word, 1) for word in words]
+            for unit, n_unit_words in units:
+                pieces.append(unit)
+                n_words += n_unit_words
+                if n_words >= words_per_page:
+                    pages.append("".join(pieces))
+                    pieces, n_words = [], 0
+        if pieces or not pages:
+            pages.append("".join(pieces))
+
+        return pages
+
     def opacity_highlight(self, token: str, highlight_format: str = Format.BOLD.value) -> str:
         """
         If the output format is HTML, then return the HTML tag for the given format. Otherwise, return the ANSI escape code
@@ -334,6 +556,8 @@ class BionicReading:
         :type highlight_format: str
         :return: A string with the token in the specified format.
         """
+        if self.compact:
+            return self.compact_highlight(token, highlight_format)
         if self.output_format == OutputFormat.HTML.value:
             if highlight_format == Format.HIGHLIGHT.value:
                 return f"<mark>{token}</mark>"
@@ -353,10 +577,56 @@ class BionicReading:
             else:
                 return f"{self.bold}{token}{self.end}"
 
+    def compact_highlight(self, token: str, highlight_format: str = Format.BOLD.value) -> str:
+        """
+        If the output format is HTML, then wrap the token in the one letter tag styled by the stylesheet. Otherwise, wrap
+        it in the shortest ANSI escape codes, the strikethrough is an escape code instead of a combining character per
+        character
+
+        :param token: The token to be highlighted
+        :type token: str
+        :param highlight_format: This is the format that you want to highlight the token with
+        :type highlight_format: str
+        :return: A string with the token in the specified format.
+        """
+        if self.output_format == OutputFormat.HTML.value:
+            tag = COMPACT_HTML_TAGS.get(highlight_format, COMPACT_HTML_TAGS[Format.BOLD.value])
+            return f"<{tag}>{token}</{tag}>"
+        else:
+            code = COMPACT_ANSI_CODES.get(highlight_format, COMPACT_ANSI_CODES[Format.BOLD.value])
+            return f"\033[{code}m{token}{COMPACT_ANSI_RESET}"
+
+    def merge_runs(self, text: str) -> str:
+        """
+        It merges the runs of the same style only separated by whitespaces, e.g. `<s>as</s> <s>the</s>` becomes
+        `<s>as the</s>`. The whitespaces between the merged words are then styled too: unlike the non-compact output, a
+        strikethrough or underline run also strikes through or underlines them, and a highlight run highlights them
+
+        :param text: The text highlighted with `compact_highlight`
+        :type text: str
+        :return: The text with the merged runs.
+        """
+        if self.output_format == OutputFormat.HTML.value:
+            tags = "|".join(COMPACT_HTML_TAGS.values())
+            return re.sub(rf"</({tags})>(\s*)<\1>", r"\2", text)
+        pieces, code, end = [], None, 0
+        for match in re.finditer(r"\x1b\[(\d+)m(.*?)\x1b\[m", text, flags=re.DOTALL):
+            gap = text[end : match.start()]
+            if match.group(1) == code and not gap.strip():
+                pieces[-1] = gap + match.group(2)
+            else:
+                pieces.extend([gap, match.group(0)[: -len(COMPACT_ANSI_RESET)]])
+            pieces.append(COMPACT_ANSI_RESET)
+            code, end = match.group(1), match.end()
+        pieces.append(text[end:])
+
+        return "".join(pieces)
+
     def fixation_highlight(self, token: str) -> Tuple[str, str]:
         """
         It takes a string and returns a tuple of two strings. The first string is the part of the string that should be
-        highlighted, and the second string is the part of the string that should not be highlighted
+        highlighted, and the second string is the part of the string that should not be highlighted. The cut point comes
+        from the fixation table when defined (a single lookup), otherwise from the fixation ratio
 
         :param token: the string to be highlighted
         :type token: str
@@ -365,7 +635,10 @@ class BionicReading:
         """
         if len(token) <= 2:
             return token[0], token[1:]
-        last_char_index = round(self.fixation * len(token))
+        if self.fixation_table is not None:
+            last_char_index = self.fixation_table.cut(token)
+        else:
+            last_char_index = round(self.fixation * len(token))
 
         return token[:last_char_index], token[last_char_index:]
 
@@ -401,25 +674,36 @@ class BionicReading:
         """
         return self.opacity_highlight(token, self.rare_words_behavior)
 
-    def highlight_tokens(self, tokens: List[str], uncommon_words: List[str]) -> List[str]:
+    def highlight_tokens(
+        self, tokens: List[str], uncommon_words: List[str], deadline: Optional[Deadline] = None
+    ) -> List[str]:
         """
         The function takes a list of tokens and an output format, and returns a list of tokens with the tokens that are
-        highlighted
+        highlighted. The deadline is checked every BUDGET_CHECK_TOKENS tokens, once it is over the remaining tokens are
+        returned unrendered
 
         :param tokens: a list of tokens to highlight
         :type tokens: List[str]
         :param uncommon_words: List of all uncommon words
         :type uncommon_words: List[str]
+        :param deadline: The end of the time budget, defaults to None
+        :type deadline: Deadline (optional)
         :return: A list of tokens with the tokens that are highlighted.
         """
+        rare_words = set(uncommon_words)
         index = 0
         highlighted_tokens = []
-        for token in tokens:
+        for position, token in enumerate(tokens):
+            if deadline is not None and position % BUDGET_CHECK_TOKENS == 0 and deadline.expired():
+                BUDGET_METRICS.increment("timed_out")
+                # a single string, so the unrendered tokens are not joined one by one with the rendered ones
+                highlighted_tokens.append(self.tokens_to_text(tokens[position:]))
+                break
             if token not in self.non_tokens:
                 index += 1
                 if token.isdigit():
                     pass
-                elif token.lower() in uncommon_words:
+                elif token.lower() in rare_words:
                     token = self.rare_words_highlight(token)
                 elif token in self.stopwords and self.stopwords_behavior not in (
                     StopWordsBehavior.HIGHLIGHT.value,
@@ -461,7 +745,10 @@ class BionicReading:
         :return: The highlighted text.
         """
         output = text
-        if self.output_format == OutputFormat.HTML.value:
+        if self.output_format == OutputFormat.HTML.value and self.compact:
+            style = "b{font-weight:%d}i{font-style:normal;background:#ff0;color:red}" % (self.opacity * 1000)
+            output = f"<!DOCTYPE html><html><head><style>{style}</style></head><body><p>{text}</p></body></html>"
+        elif self.output_format == OutputFormat.HTML.value:
             style = "b {font-weight: %d} " % (self.opacity * 1000)
             style += "mark {color: red;} "
             output = f"<!DOCTYPE html><html><head><style>{style}</style></head><body><p>{text}</p></body></html>"
@@ -471,22 +758,84 @@ class BionicReading:
     def read_faster(
         self,
         text: str,
+        uncommon_words: Optional[List[str]] = None,
+        max_chars: Optional[int] = None,
+        time_budget: Optional[float] = None,
     ) -> str:
         """
         The function takes a string of text, splits it into a list of words, highlights the words, and then returns the
-        highlighted text
+        highlighted text. When a budget is hit the result is degraded instead of delayed: the text beyond max_chars, or
+        the text left when the time budget is spent, is appended unrendered, and the rare words are not analysed on a
+        text longer than rare_words_max_chars or when the time budget is spent before they are counted. Every step
+        checks the time budget at least once per BUDGET_CHECK_CHARS characters. BUDGET_METRICS counts the budgets hit
 
         :param text: the text you want to read faster
         :type text: str
+        :param uncommon_words: The rare words of the whole document, computed from the text when not given, e.g. when
+        the text is a page of a larger document
+        :type uncommon_words: List[str]
+        :param max_chars: Overrides the max_chars attribute for this call
+        :type max_chars: int
+        :param time_budget: Overrides the time_budget attribute for this call
+        :type time_budget: float
         :return: The highlighted text
         """
-        tokens = self.split_text_to_words(text)
-        uncommon_words = self.get_rare_words(text)
-        highlighted_tokens = self.highlight_tokens(tokens, uncommon_words)
+        assert max_chars is None or isinstance(max_chars, int), "please use a max_chars int type"
+        assert max_chars is None or max_chars > 0, "please enter a max_chars greater than 0"
+        assert time_budget is None or isinstance(time_budget, (int, float)), "please use a time_budget float type"
+        assert time_budget is None or time_budget >= 0, "please enter a time_budget greater than or equal to 0"
+        deadline = Deadline(time_budget if time_budget is not None else self.time_budget)
+        max_chars = max_chars if max_chars is not None else self.max_chars
+        BUDGET_METRICS.increment("calls")
+        tail = ""
+        if max_chars is not None and len(text) > max_chars:
+            # cut after the last whitespace so no word is split between the rendered text and the tail
+            cut = max(text.rfind(" ", 0, max_chars), text.rfind("\n", 0, max_chars)) + 1 or max_chars
+            text, tail = text[:cut], text[cut:]
+            BUDGET_METRICS.increment("truncated")
+        tokens, timed_out = [], False
+        for chunk in self.split_text_to_chunks(text):
+            if deadline.expired():
+                timed_out = True
+                break
+            tokens.extend(self.split_text_to_words(chunk))
+        if timed_out:
+            # the budget is spent before the text is split, the whole text is appended unrendered
+            BUDGET_METRICS.increment("timed_out")
+            tokens, text, tail = [], "", text + tail
+        if uncommon_words is None:
+            if not timed_out and (self.rare_words_max_chars is None or len(text) <= self.rare_words_max_chars):
+                uncommon_words = self.get_rare_words(text, deadline)
+            if uncommon_words is None:
+                BUDGET_METRICS.increment("rare_words_skipped")
+                uncommon_words = []
+        highlighted_tokens = self.highlight_tokens(tokens, uncommon_words, deadline)
         highlighted_text = self.tokens_to_text(highlighted_tokens)
+        if self.compact:
+            highlighted_text = self.merge_runs(highlighted_text)
+        highlighted_text += tail
 
         return self.to_output_format(highlighted_text)
 
+    def read_faster_compressed(self, text: str, compression: str = Compression.GZIP.value) -> bytes:
+        """
+        The function highlights the text like `read_faster` and compresses the output, so it can be cached and served
+        with the matching Content-Encoding without compressing it again
+
+        :param text: the text you want to read faster
+        :type text: str
+        :param compression: The compression algorithm (gzip, br)
+        :type compression: str
+        :return: The compressed highlighted text
+        """
+        possible_values = [compression.value for compression in Compression]
+        assert compression in possible_values, f"please enter a compression within {possible_values}"
+        assert (
+            compression != Compression.BROTLI.value or importlib.util.find_spec("brotli") is not None
+        ), "please install brotli to use the br compression"
+
+        return compress_string(self.read_faster(text), compression)
+
 
 if __name__ == "__main__":
     text = """
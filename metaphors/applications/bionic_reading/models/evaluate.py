@@ -0,0 +1,22 @@
+from typing import Callable, Dict, Iterable, Tuple
+
+
+def evaluate(cut: Callable[[str], int], examples: Iterable[Tuple[str, int]]) -> Dict[str, float]:
+    """
+    It compares the predicted cut points with the labeled ones
+
+    :param cut: The function returning the number of characters to highlight of a word, like `FixationTable.cut`
+    :type cut: Callable[[str], int]
+    :param examples: The words and their best number of characters to highlight
+    :type examples: Iterable[Tuple[str, int]]
+    :return: The accuracy and the mean absolute error of the cut points.
+    """
+    n_words, n_correct, total_error = 0, 0, 0
+    for word, expected in examples:
+        error = abs(cut(word) - expected)
+        n_words += 1
+        n_correct += error == 0
+        total_error += error
+    assert n_words, "please provide at least one labeled word"
+
+    return {"accuracy": n_correct / n_words, "mae": total_error / n_words}
@@ -0,0 +1,83 @@
+import zlib
+import struct
+
+from typing import Sequence
+
+
+SLOT_STRUCT = struct.Struct("<IHBx")
+
+
+class FixationTable:
+    """Precomputed word -> cut point table, with a length based fallback rule for unknown words."""
+
+    def __init__(
+        self,
+        buffer: Sequence[int],
+        n_slots: int,
+        slots_offset: int,
+        blob_offset: int,
+        fallback_cuts: bytes,
+        fallback_ratio: float,
+    ):
+        """
+        Inits FixationTable
+
+        :param buffer: The raw table, usually a read-only mmap of the file written by `save_fixation_table`
+        :type buffer: Sequence[int]
+        :param n_slots: Number of slots of the open addressing hash table, must be a power of 2
+        :type n_slots: int
+        :param slots_offset: Position of the first slot in the buffer
+        :type slots_offset: int
+        :param blob_offset: Position of the utf-8 encoded words in the buffer
+        :type blob_offset: int
+        :param fallback_cuts: Cut point per word length for the words not in the table, 0 means use the fallback ratio
+        :type fallback_cuts: bytes
+        :param fallback_ratio: Ratio of the word length to highlight when there is no cut point for the length
+        :type fallback_ratio: float
+        """
+        assert n_slots > 0 and n_slots & (n_slots - 1) == 0, "please use a power of 2 number of slots"
+        self.buffer = buffer
+        self.n_slots = n_slots
+        self.slots_offset = slots_offset
+        self.blob_offset = blob_offset
+        self.fallback_cuts = fallback_cuts
+        self.fallback_ratio = fallback_ratio
+        self._mask = n_slots - 1
+
+    def fallback(self, length: int) -> int:
+        """
+        It returns the cut point of a word which is not in the table, only based on its length
+
+        :param length: The length of the word
+        :type length: int
+        :return: The number of characters to highlight.
+        """
+        cut = self.fallback_cuts[length] if length < len(self.fallback_cuts) else 0
+
+        return cut if cut else round(self.fallback_ratio * length)
+
+    def cut(self, token: str) -> int:
+        """
+        It looks up the cut point of the token in the table (O(1) expected), and uses the fallback rule if the token is
+        unknown. The returned cut point is always between 1 and the length of the token
+
+        :param token: The token to split
+        :type token: str
+        :return: The number of characters of the token to highlight.
+        """
+        word = token.lower().encode("utf-8")
+        slot = zlib.crc32(word) & self._mask
+        cut = 0
+        while True:
+            offset, length, slot_cut = SLOT_STRUCT.unpack_from(self.buffer, self.slots_offset + slot * SLOT_STRUCT.size)
+            if length == 0:
+                break
+            start = self.blob_offset + offset
+            if length == len(word) and self.buffer[start : start + length] == word:
+                cut = slot_cut
+                break
+            slot = (slot + 1) & self._mask
+        if not cut:
+            cut = self.fallback(len(token))
+
+        return min(max(cut, 1), len(token))
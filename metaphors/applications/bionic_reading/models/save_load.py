@@ -0,0 +1,100 @@
+import os
+import mmap
+import zlib
+import pickle
+import struct
+
+from typing import Any, Dict, List
+
+from metaphors.applications.bionic_reading.models.predict import SLOT_STRUCT, FixationTable
+from metaphors.applications.bionic_reading.settings import FIXATION_TABLE_MAGIC
+
+
+HEADER_STRUCT = struct.Struct("<4sIIIf")
+
+
+def save_model(model: Any, path: str):
+    """
+    It pickles a trained model to the given path
+
+    :param model: The model to save
+    :type model: Any
+    :param path: The path of the file to write
+    :type path: str
+    """
+    with open(path, "wb") as file:
+        pickle.dump(model, file)
+
+
+def load_model(path: str) -> Any:
+    """
+    It loads a model pickled with `save_model`
+
+    :param path: The path of the file to read
+    :type path: str
+    :return: The trained model.
+    """
+    assert os.path.exists(path), f"file {path} doesn't exists."
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def save_fixation_table(path: str, cuts: Dict[str, int], fallback_cuts: List[int], fallback_ratio: float):
+    """
+    It writes a word -> cut point table as an open addressing hash table, so it can be memory-mapped and queried
+    without being parsed. The file is made of a header, the fallback cut points, the slots and the words
+
+    :param path: The path of the file to write
+    :type path: str
+    :param cuts: The cut point of each word
+    :type cuts: Dict[str, int]
+    :param fallback_cuts: The cut point per word length, used for the words not in the table
+    :type fallback_cuts: List[int]
+    :param fallback_ratio: Ratio of the word length to highlight when there is no cut point for the length
+    :type fallback_ratio: float
+    """
+    n_slots = 1
+    while n_slots < 2 * len(cuts):
+        n_slots *= 2
+    slots = bytearray(n_slots * SLOT_STRUCT.size)
+    blob = bytearray()
+    mask = n_slots - 1
+    for word, cut in cuts.items():
+        encoded = word.lower().encode("utf-8")
+        slot = zlib.crc32(encoded) & mask
+        while SLOT_STRUCT.unpack_from(slots, slot * SLOT_STRUCT.size)[1]:
+            slot = (slot + 1) & mask
+        SLOT_STRUCT.pack_into(slots, slot * SLOT_STRUCT.size, len(blob), len(encoded), min(max(cut, 0), 255))
+        blob += encoded
+    fallback = bytes(min(max(cut, 0), 255) for cut in fallback_cuts)
+    header = HEADER_STRUCT.pack(FIXATION_TABLE_MAGIC, n_slots, len(fallback), len(blob), fallback_ratio)
+    with open(path, "wb") as file:
+        file.write(header + fallback + slots + blob)
+
+
+def load_fixation_table(path: str) -> FixationTable:
+    """
+    It memory-maps a table written by `save_fixation_table`, only the header and the fallback cut points are read
+
+    :param path: The path of the file to read
+    :type path: str
+    :return: A FixationTable backed by the memory-mapped file.
+    """
+    assert os.path.exists(path), f"file {path} doesn't exists."
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, n_slots, n_fallback, blob_size, fallback_ratio = HEADER_STRUCT.unpack_from(buffer, 0)
+    assert magic == FIXATION_TABLE_MAGIC, f"file {path} is not a fixation table."
+    fallback_offset = HEADER_STRUCT.size
+    slots_offset = fallback_offset + n_fallback
+    blob_offset = slots_offset + n_slots * SLOT_STRUCT.size
+    assert len(buffer) == blob_offset + blob_size, f"file {path} is truncated."
+
+    return FixationTable(
+        buffer=buffer,
+        n_slots=n_slots,
+        slots_offset=slots_offset,
+        blob_offset=blob_offset,
+        fallback_cuts=bytes(buffer[fallback_offset:slots_offset]),
+        fallback_ratio=fallback_ratio,
+    )
@@ -0,0 +1,130 @@
+import math
+import numpy as np
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sklearn.tree import DecisionTreeRegressor
+
+from metaphors.applications.bionic_reading.models.save_load import save_fixation_table
+from metaphors.applications.bionic_reading.settings import FIXATION_FALLBACK_MAX_LENGTH
+from metaphors.applications.bionic_reading.settings import FIXATION_PREFIXES, FIXATION_SUFFIXES
+
+
+VOWELS = set("aeiouy")
+
+
+def word_features(word: str, frequency: int = 0) -> List[float]:
+    """
+    It computes the features of a word used to predict its cut point: the length, the log frequency, the share of
+    vowels, the position of the first vowel and the length of the known prefix and suffix
+
+    :param word: The word to featurize
+    :type word: str
+    :param frequency: The number of occurrences of the word in the corpus, defaults to 0
+    :type frequency: int (optional)
+    :return: A list of features.
+    """
+    word = word.lower()
+    length = len(word)
+    vowels = [index for index, char in enumerate(word) if char in VOWELS]
+    prefix = max(
+        (len(prefix) for prefix in FIXATION_PREFIXES if word.startswith(prefix) and len(prefix) < length), default=0
+    )
+    suffix = max(
+        (len(suffix) for suffix in FIXATION_SUFFIXES if word.endswith(suffix) and len(suffix) < length), default=0
+    )
+
+    return [
+        float(length),
+        math.log1p(frequency),
+        len(vowels) / length if length else 0.0,
+        float(vowels[0]) if vowels else float(length),
+        float(prefix),
+        float(suffix),
+    ]
+
+
+class FixationModel:
+    """Predicts the ratio of a word to highlight from its length, frequency and morphology."""
+
+    def __init__(self, max_depth: int = 8, min_samples_leaf: int = 5):
+        """
+        Inits FixationModel
+
+        :param max_depth: Maximum depth of the regression tree
+        :type max_depth: int
+        :param min_samples_leaf: Minimum number of words in a leaf of the regression tree
+        :type min_samples_leaf: int
+        """
+        self.regressor = DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=min_samples_leaf)
+        self.fallback_cuts: List[int] = []
+        self.fallback_ratio = 0.6
+
+    def fit(self, examples: Iterable[Tuple[str, int]], frequencies: Optional[Dict[str, int]] = None) -> "FixationModel":
+        """
+        It fits the model on words labeled with their best cut point, and learns the fallback rule used for the words
+        which are not exported in the table: the median cut point per word length and the median ratio
+
+        :param examples: The words and the number of characters to highlight
+        :type examples: Iterable[Tuple[str, int]]
+        :param frequencies: The number of occurrences of each word in the corpus
+        :type frequencies: Dict[str, int]
+        :return: The fitted model.
+        """
+        frequencies = frequencies or {}
+        features, ratios = [], []
+        cuts_per_length = defaultdict(list)
+        for word, cut in examples:
+            if not word:
+                continue
+            features.append(word_features(word, frequencies.get(word.lower(), 0)))
+            ratios.append(cut / len(word))
+            cuts_per_length[len(word)].append(cut)
+        assert features, "please provide at least one labeled word"
+        self.regressor.fit(np.array(features), np.array(ratios))
+        self.fallback_ratio = float(np.median(ratios))
+        self.fallback_cuts = [
+            int(np.median(cuts_per_length[length])) if length in cuts_per_length else 0
+            for length in range(FIXATION_FALLBACK_MAX_LENGTH)
+        ]
+
+        return self
+
+    def predict(self, words: List[str], frequencies: Optional[Dict[str, int]] = None) -> List[int]:
+        """
+        It predicts the number of characters to highlight for each word
+
+        :param words: The words to split
+        :type words: List[str]
+        :param frequencies: The number of occurrences of each word in the corpus
+        :type frequencies: Dict[str, int]
+        :return: A list of cut points, between 1 and the length of the word.
+        """
+        if not words:
+            return []
+        frequencies = frequencies or {}
+        features = np.array([word_features(word, frequencies.get(word.lower(), 0)) for word in words])
+        ratios = self.regressor.predict(features)
+
+        return [min(max(round(ratio * len(word)), 1), len(word)) for word, ratio in zip(words, ratios)]
+
+    def export(self, path: str, vocabulary: Iterable[str], frequencies: Optional[Dict[str, int]] = None):
+        """
+        It precomputes the cut point of every word of the vocabulary and writes them, with the fallback rule, as a
+        table which can be memory-mapped by `load_fixation_table`. Only the words whose cut point differs from the
+        fallback rule are kept, so the table stays compact
+
+        :param path: The path of the table to write
+        :type path: str
+        :param vocabulary: The words to precompute
+        :type vocabulary: Iterable[str]
+        :param frequencies: The number of occurrences of each word in the corpus
+        :type frequencies: Dict[str, int]
+        """
+        words = sorted({word.lower() for word in vocabulary if word})
+        cuts = {}
+        for word, cut in zip(words, self.predict(words, frequencies)):
+            fallback = self.fallback_cuts[len(word)] if len(word) < len(self.fallback_cuts) else 0
+            if cut != (fallback or round(self.fallback_ratio * len(word))):
+                cuts[word] = cut
+        save_fixation_table(path, cuts, self.fallback_cuts, self.fallback_ratio)
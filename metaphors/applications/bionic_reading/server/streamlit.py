@@ -1,7 +1,168 @@
+import weakref
 import streamlit as st
 
+from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+
 from metaphors.applications.bionic_reading import BionicReading
-from metaphors.applications.bionic_reading.settings import StopWordsBehavior, RareBehavior
+from metaphors.applications.bionic_reading.settings import StopWordsBehavior, RareBehavior, WORDS_PER_PAGE
+
+
+class RenderedDocument:
+    """The pages of a document and the ones already rendered, kept in the session state across the reruns of the app."""
+
+    def __init__(self, key: tuple, renderer: BionicReading, pages: List[str], uncommon_words: List[str]):
+        """
+        Inits RenderedDocument
+
+        :param key: The parameters of the renderer and the text, to know when the document changes
+        :type key: tuple
+        :param renderer: The BionicReading used to render the pages
+        :type renderer: BionicReading
+        :param pages: The pages of the document
+        :type pages: List[str]
+        :param uncommon_words: The rare words of the whole document
+        :type uncommon_words: List[str]
+        """
+        self.key = key
+        self.renderer = renderer
+        self.pages = pages
+        self.uncommon_words = uncommon_words
+        self.rendered: Dict[int, str] = {}
+        self.future: Optional[Future] = None
+        self.cancelled = False
+
+    @property
+    def progress(self) -> float:
+        """
+        It returns the share of the pages already rendered
+        :return: A float between 0 and 1.
+        """
+        return len(self.rendered) / len(self.pages)
+
+    @property
+    def rendering(self) -> bool:
+        """
+        It checks whether the background worker is rendering the document
+        :return: True until the background rendering is done or cancelled.
+        """
+        return self.future is not None and not self.future.done()
+
+    def render(self, index: int) -> str:
+        """
+        It renders a page, only the first time it is asked for
+
+        :param index: The index of the page
+        :type index: int
+        :return: The html of the page.
+        """
+        if index not in self.rendered:
+            self.rendered[index] = self.renderer.read_faster(self.pages[index], uncommon_words=self.uncommon_words)
+
+        return self.rendered[index]
+
+    def start(self):
+        """
+        It starts the background rendering of the other pages. The worker only holds a weak reference to the document,
+        so it stops once the session holding the document is closed
+        """
+        if self.future is None and len(self.pages) > 1:
+            self.future = get_executor().submit(render_in_background, weakref.ref(self))
+
+    def cancel(self):
+        """
+        It stops the background rendering of the document, when the session moves to another document
+        """
+        self.cancelled = True
+
+
+def render_in_background(reference: weakref.ref):
+    """
+    It renders every page of a document, called from the background worker so the next pages are ready when they are
+    shown. It stops as soon as the document is cancelled or garbage collected, so the worker moves on to the documents
+    currently displayed
+
+    :param reference: A weak reference to the document
+    :type reference: weakref.ref
+    """
+    index = 0
+    while True:
+        document = reference()
+        if document is None or document.cancelled or index >= len(document.pages):
+            return
+        document.render(index)
+        index += 1
+        # no strong reference is kept between two pages
+        del document
+
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """
+    It returns the background worker rendering the documents, shared by all the sessions
+    :return: A ThreadPoolExecutor with a single worker.
+    """
+    return ThreadPoolExecutor(max_workers=1)
+
+
+@st.cache_resource(max_entries=32)
+def get_renderer(
+    fixation: float,
+    saccades: float,
+    opacity: float,
+    stopwords: float,
+    stopwords_behavior: str,
+    rare_words_behavior: str,
+    rare_words_max_freq: int,
+) -> BionicReading:
+    """
+    It returns the BionicReading of the given parameters, built once per set of parameters
+    :return: A BionicReading rendering compact html.
+    """
+    return BionicReading(
+        fixation=fixation,
+        saccades=saccades,
+        opacity=opacity,
+        stopwords=stopwords,
+        stopwords_behavior=stopwords_behavior,
+        output_format="html",
+        rare_words_behavior=rare_words_behavior,
+        rare_words_max_freq=rare_words_max_freq,
+        compact=True,
+    )
+
+
+@st.cache_data(max_entries=8)
+def get_pages(text: str) -> List[str]:
+    """
+    It splits the text into pages, once per text
+    :return: The pages of the text.
+    """
+    return BionicReading.split_text_to_pages(text, WORDS_PER_PAGE)
+
+
+@st.cache_data(max_entries=8)
+def get_rare_words(text: str, rare_words_max_freq: int) -> List[str]:
+    """
+    It computes the rare words of the whole text, once per text and max frequency
+    :return: The rare words of the text.
+    """
+    return BionicReading(rare_words_max_freq=rare_words_max_freq).get_rare_words(text)
+
+
+@st.fragment(run_every=1.0)
+def show_progress(document: RenderedDocument):
+    """
+    It shows the share of the pages rendered by the background worker, refreshed every second while it runs. The app is
+    rerun once the rendering is over, so the fragment is not shown and not refreshed anymore
+
+    :param document: The document being rendered
+    :type document: RenderedDocument
+    """
+    if not document.rendering:
+        st.rerun()
+    st.progress(document.progress)
+    st.caption(f"{len(document.rendered)}/{len(document.pages)} pages rendered")
 
 
 class BionicReadingApp:
@@ -13,7 +174,8 @@ class BionicReadingApp:
     @staticmethod
     def start():
         """
-        It creates a function that takes in the text and returns the text with the bionic reading features.
+        It creates a function that takes in the text and returns the text with the bionic reading features. Only the
+        selected page is rendered and sent, the other pages of a long text are rendered by a background worker.
         """
         st.title("Bionic Reading")
         fixation = st.slider("fixation strength", min_value=0.0, max_value=1.0, value=0.7)
@@ -27,14 +189,34 @@ class BionicReadingApp:
         rare_words_max_freq = st.slider("rare_words_max_freq", min_value=0, max_value=100)
         text = st.text_area("Enter the text here:")
         if text:
-            _ = BionicReading(
-                fixation=fixation,
-                saccades=saccades,
-                opacity=opacity,
-                stopwords=stopwords,
-                stopwords_behavior=stopwords_behavior,
-                output_format="html",
-                rare_words_behavior=rare_words_behavior,
-                rare_words_max_freq=rare_words_max_freq,
-            ).read_faster(text=text)
-            st.markdown(_, unsafe_allow_html=True)
+            renderer_key = (
+                fixation,
+                saccades,
+                opacity,
+                stopwords,
+                stopwords_behavior,
+                rare_words_behavior,
+                rare_words_max_freq,
+            )
+            key = (renderer_key, text)
+            document = st.session_state.get("bionic_reading_document")
+            if document is None or document.key != key:
+                # a document belongs to a single session, so moving to another text never stops the rendering of a
+                # document displayed elsewhere
+                if document is not None:
+                    document.cancel()
+                renderer = get_renderer(*renderer_key)
+                document = RenderedDocument(
+                    key=key,
+                    renderer=renderer,
+                    pages=get_pages(text),
+                    uncommon_words=get_rare_words(text, renderer.rare_words_max_freq),
+                )
+                st.session_state["bionic_reading_document"] = document
+            document.start()
+            page = 1
+            if len(document.pages) > 1:
+                page = st.number_input("page", min_value=1, max_value=len(document.pages), value=1, step=1)
+            st.markdown(document.render(int(page) - 1), unsafe_allow_html=True)
+            if document.rendering:
+                show_progress(document)
@@ -29,3 +29,34 @@ class Format(Enum):
     HIGHLIGHT = "highlight"
     UNDERLINE = "underline"
     BOLD = "bold"
+
+
+FIXATION_TABLE_MAGIC = b"FXT1"
+FIXATION_FALLBACK_MAX_LENGTH = 32
+FIXATION_PREFIXES = ("anti", "dis", "inter", "non", "over", "pre", "re", "sub", "super", "trans", "un", "under")
+FIXATION_SUFFIXES = ("able", "al", "ed", "er", "ful", "ible", "ing", "ion", "less", "ly", "ment", "ness", "ous")
+
+
+class Compression(Enum):
+    GZIP = "gzip"
+    BROTLI = "br"
+
+
+COMPACT_HTML_TAGS = {
+    Format.STRIKETHROUGH.value: "s",
+    Format.HIGHLIGHT.value: "i",
+    Format.UNDERLINE.value: "u",
+    Format.BOLD.value: "b",
+}
+COMPACT_ANSI_CODES = {
+    Format.STRIKETHROUGH.value: 9,
+    Format.HIGHLIGHT.value: 93,
+    Format.UNDERLINE.value: 4,
+    Format.BOLD.value: 1,
+}
+COMPACT_ANSI_RESET = "\033[m"
+
+
+WORDS_PER_PAGE = 500
+BUDGET_CHECK_TOKENS = 1024
+BUDGET_CHECK_CHARS = 65536
@@ -1,4 +1,6 @@
+import gzip
 import unittest
+import importlib.util
 
 from metaphors.applications.bionic_reading.features.bionic_reading import BionicReading
 
@@ -35,3 +37,52 @@ class TestBionicReading(unittest.TestCase):
             BionicReading(fixation=0.6, saccades=0.75, opacity=0.7, output_format="html").read_faster(text=text)
             == expected_output
         )
+
+    def test_html_compact(self):
+        text = "We are happy if as many people as possible can use the advantage of Bionic Reading."
+        expected_output = "<!DOCTYPE html><html><head><style>b{font-weight:700}i{font-style:normal;background:#ff0;color:red}</style></head><body><p><b>W</b>e <b>ar</b>e <u>happy</u> <b>i</b>f <s>as</s> <b>ma</b>ny <u>people</u> <s>as</s> <b>possi</b>ble <b>ca</b>n <b>us</b>e <s>the</s> <u>advantage</u> <s>of</s> <u>Bionic Reading</u>.</p></body></html>"
+        self.assertTrue(
+            BionicReading(fixation=0.6, saccades=0.75, opacity=0.7, output_format="html", compact=True).read_faster(
+                text=text
+            )
+            == expected_output
+        )
+
+    def test_python_compact(self):
+        text = "We are happy if as many people as possible can use the advantage of Bionic Reading."
+        expected_output = "\x1b[1mW\x1b[me \x1b[1mar\x1b[me \x1b[4mhappy\x1b[m \x1b[1mi\x1b[mf \x1b[9mas\x1b[m \x1b[1mma\x1b[mny \x1b[4mpeople\x1b[m \x1b[9mas\x1b[m \x1b[1mpossi\x1b[mble \x1b[1mca\x1b[mn \x1b[1mus\x1b[me \x1b[9mthe\x1b[m \x1b[4madvantage\x1b[m \x1b[9mof\x1b[m \x1b[4mBionic Reading\x1b[m."
+        self.assertTrue(
+            BionicReading(fixation=0.6, saccades=0.75, opacity=0.7, output_format="python", compact=True).read_faster(
+                text=text
+            )
+            == expected_output
+        )
+
+    def test_split_text_to_pages(self):
+        text = "We are happy\nif as many people\nas possible\ncan use it."
+        pages = BionicReading.split_text_to_pages(text, words_per_page=4)
+        self.assertEqual(pages, ["We are happy\nif as many people\n", "as possible\ncan use it."])
+        self.assertEqual(BionicReading.split_text_to_pages(""), [""])
+        text = "word " * 1000 + "end"
+        pages = BionicReading.split_text_to_pages(text, words_per_page=300)
+        self.assertEqual([len(page.split()) for page in pages], [300, 300, 300, 101])
+        self.assertEqual("".join(pages), text)
+
+    def test_pages_use_document_rare_words(self):
+        text = "We are happy if as many people as possible can use the advantage of Bionic Reading."
+        bionic_reading = BionicReading(fixation=0.6, saccades=0.75, opacity=0.7, output_format="html")
+        self.assertTrue(
+            bionic_reading.read_faster(text, uncommon_words=bionic_reading.get_rare_words(text))
+            == bionic_reading.read_faster(text)
+        )
+
+    def test_compressed(self):
+        text = "We are happy if as many people as possible can use the advantage of Bionic Reading."
+        bionic_reading = BionicReading(output_format="html", compact=True)
+        self.assertEqual(
+            gzip.decompress(bionic_reading.read_faster_compressed(text)).decode("utf-8"),
+            bionic_reading.read_faster(text),
+        )
+        if importlib.util.find_spec("brotli") is None:
+            with self.assertRaises(AssertionError):
+                bionic_reading.read_faster_compressed(text, "br")
@@ -0,0 +1,45 @@
+import time
+import unittest
+
+from metaphors.applications.bionic_reading.utils.budget import BUDGET_METRICS
+from metaphors.applications.bionic_reading.features.bionic_reading import BionicReading
+
+
+class TestBudget(unittest.TestCase):
+    def setUp(self):
+        self.text = "We are happy if as many people as possible can use the advantage of Bionic Reading."
+        BUDGET_METRICS.reset()
+
+    def test_max_chars(self):
+        bionic_reading = BionicReading(fixation=0.6, saccades=0.75, output_format="python", max_chars=13)
+        output = bionic_reading.read_faster(text=self.text)
+        self.assertTrue(output.endswith(" if as many people as possible can use the advantage of Bionic Reading."))
+        self.assertTrue(output.startswith("\x1b[1mW\x1b[0me \x1b[1mar\x1b[0me"))
+        self.assertEqual(BUDGET_METRICS.snapshot(), {"calls": 1, "truncated": 1})
+
+    def test_time_budget(self):
+        bionic_reading = BionicReading(output_format="python")
+        self.assertEqual(bionic_reading.read_faster(text=self.text, time_budget=0), self.text)
+        self.assertEqual(BUDGET_METRICS.snapshot(), {"calls": 1, "rare_words_skipped": 1, "timed_out": 1})
+
+    def test_rare_words_max_chars(self):
+        bionic_reading = BionicReading(output_format="python", rare_words_max_chars=10)
+        self.assertNotIn("\x1b[4m", bionic_reading.read_faster(text=self.text))
+        self.assertEqual(BUDGET_METRICS.snapshot(), {"calls": 1, "rare_words_skipped": 1})
+
+    def test_time_budget_large_text(self):
+        bionic_reading = BionicReading(output_format="html")
+        text = " ".join(f"word{index % 5000} advantage" for index in range(200000))
+        start = time.perf_counter()
+        output = bionic_reading.read_faster(text=text, time_budget=0.1)
+        # the budget is checked between chunks, the overshoot is a chunk and the copy of the unrendered text
+        self.assertLess(time.perf_counter() - start, 0.3)
+        self.assertIn(text[-1000:], output)
+        self.assertEqual(BUDGET_METRICS.snapshot()["timed_out"], 1)
+
+    def test_invalid_overrides(self):
+        bionic_reading = BionicReading(output_format="python")
+        with self.assertRaises(AssertionError):
+            bionic_reading.read_faster(text=self.text, max_chars=-5)
+        with self.assertRaises(AssertionError):
+            bionic_reading.read_faster(text=self.text, time_budget=-1)
@@ -0,0 +1,77 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+import contextlib
+
+from metaphors.applications.bionic_reading.etl.bulk_rendering import bulk_render, main, MANIFEST_NAME
+
+
+class TestBulkRendering(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.directory.name, "input")
+        self.output_path = os.path.join(self.directory.name, "output")
+        self.config = {"output_format": "html", "compact": True}
+        os.makedirs(os.path.join(self.input_path, "chapter"))
+        for name, text in [("a.txt", "We are happy."), ("chapter/b.txt", "Bionic Reading.")]:
+            with open(os.path.join(self.input_path, name), "w") as file:
+                file.write(text)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_directory_is_resumed(self):
+        self.assertEqual(bulk_render(self.input_path, self.output_path, self.config, workers=1)["rendered"], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.output_path, "chapter", "b.html")))
+        with open(os.path.join(self.input_path, "a.txt"), "w") as file:
+            file.write("We are very happy.")
+        stats = bulk_render(self.input_path, self.output_path, self.config, workers=1)
+        self.assertEqual(stats, {"rendered": 1, "skipped": 1, "failures": []})
+        stats = bulk_render(self.input_path, self.output_path, {**self.config, "compact": False}, workers=1)
+        self.assertEqual(stats, {"rendered": 2, "skipped": 0, "failures": []})
+        with open(os.path.join(self.output_path, MANIFEST_NAME)) as file:
+            self.assertEqual(len(file.readlines()), 2)
+
+    def test_jsonl(self):
+        path = os.path.join(self.directory.name, "input.jsonl")
+        with open(path, "w") as file:
+            file.write(json.dumps({"id": "doc-1", "text": "We are happy."}) + "\n")
+        self.assertEqual(
+            bulk_render(path, self.output_path, self.config, workers=1), {"rendered": 1, "skipped": 0, "failures": []}
+        )
+        self.assertEqual(
+            bulk_render(path, self.output_path, self.config, workers=1), {"rendered": 0, "skipped": 1, "failures": []}
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.output_path, "doc-1.html")))
+
+    def test_failed_input_does_not_stop_the_run(self):
+        with open(os.path.join(self.input_path, "broken.txt"), "wb") as file:
+            file.write(b"\xff\xfe invalid utf-8")
+        stats = bulk_render(self.input_path, self.output_path, self.config, workers=1)
+        self.assertEqual(stats["rendered"], 2)
+        self.assertEqual([key for key, _ in stats["failures"]], ["broken.txt"])
+        self.assertEqual(main([self.input_path, self.output_path, "--workers", "1", "--compact"]), 1)
+
+    def test_jsonl_invalid_ids(self):
+        path = os.path.join(self.directory.name, "input.jsonl")
+        records = [
+            {"id": "../escaped", "text": "We are happy."},
+            {"id": "doc-1", "text": "We are happy."},
+            {"id": "doc-1", "text": "Bionic Reading."},
+            {"id": "doc-2"},
+        ]
+        with open(path, "w") as file:
+            file.write("".join(json.dumps(record) + "\n" for record in records) + "{not json\n")
+        stats = bulk_render(path, self.output_path, self.config, workers=1)
+        self.assertEqual(stats["rendered"], 1)
+        self.assertEqual([key for key, _ in stats["failures"]], ["../escaped", "doc-1", "line 4", "line 5"])
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "escaped.html")))
+
+    def test_directory_progress_has_eta(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            bulk_render(self.input_path, self.output_path, self.config, workers=1)
+        self.assertIn("2/2 rendered", stderr.getvalue())
+        self.assertIn("ETA 0s", stderr.getvalue())
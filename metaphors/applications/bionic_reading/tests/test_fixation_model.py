@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from metaphors.applications.bionic_reading.models.train import FixationModel
+from metaphors.applications.bionic_reading.models.evaluate import evaluate
+from metaphors.applications.bionic_reading.models.save_load import save_fixation_table, load_fixation_table
+from metaphors.applications.bionic_reading.features.bionic_reading import BionicReading
+
+
+class TestFixationModel(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "fixation_table.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_table_lookup_and_fallback(self):
+        save_fixation_table(self.path, {"reading": 4, "happy": 2}, fallback_cuts=[0, 0, 0, 0, 3], fallback_ratio=0.5)
+        table = load_fixation_table(self.path)
+        self.assertEqual(table.cut("reading"), 4)
+        self.assertEqual(table.cut("Happy"), 2)
+        self.assertEqual(table.cut("word"), 3)
+        self.assertEqual(table.cut("advantage"), 4)
+        self.assertEqual(table.cut("x"), 1)
+
+    def test_train_export_evaluate(self):
+        # the prefixed words are cut after their prefix, the other words follow the length rule
+        words = ["bionic", "reading", "machine", "network", "complex", "history", "language", "sequence", "position"]
+        prefixed = ["unhappy", "rewrite", "unknown", "reloaded", "unlikely"]
+        examples = [(word, round(0.6 * len(word))) for word in words] + [(word, 2) for word in prefixed]
+        model = FixationModel(min_samples_leaf=1).fit(examples * 3)
+        model.export(self.path, [word for word, _ in examples])
+        table = load_fixation_table(self.path)
+        self.assertEqual(evaluate(table.cut, examples)["accuracy"], 1.0)
+        for word in prefixed:
+            self.assertNotEqual(table.fallback(len(word)), 2)
+            self.assertEqual(table.cut(word), 2)
+        self.assertEqual(table.cut("UNHAPPY"), 2)
+
+    def test_bionic_reading_uses_table(self):
+        save_fixation_table(self.path, {"people": 1}, fallback_cuts=[], fallback_ratio=0.6)
+        output = BionicReading(
+            fixation=0.6,
+            saccades=0.75,
+            rare_words_max_freq=0,
+            output_format="html",
+            fixation_table=load_fixation_table(self.path),
+        ).read_faster(text="many people")
+        self.assertIn("<b>ma</b>ny <b>p</b>eople", output)
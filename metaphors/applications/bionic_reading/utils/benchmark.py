@@ -0,0 +1,40 @@
+import sys
+import importlib.util
+
+from typing import Any, Dict
+
+from metaphors.utils.json_utils import read_text_file
+from metaphors.utils.string_utils import compress_string
+from metaphors.applications.bionic_reading.features.bionic_reading import BionicReading
+from metaphors.applications.bionic_reading.settings import OutputFormat, Compression
+
+
+def output_size_report(text: str, **kwargs: Any) -> Dict[str, float]:
+    """
+    It renders the text in every output mode and reports the number of output bytes per input word, the compressed
+    sizes are computed on the compact html output
+
+    :param text: The text to render
+    :type text: str
+    :param kwargs: The parameters given to BionicReading, except output_format and compact
+    :type kwargs: Any
+    :return: The number of bytes per input word of each output mode.
+    """
+    n_words = max(len(text.split()), 1)
+    report = {"input": len(text.encode("utf-8")) / n_words}
+    for output_format in (OutputFormat.HTML.value, OutputFormat.PYTHON.value):
+        for compact in (False, True):
+            output = BionicReading(output_format=output_format, compact=compact, **kwargs).read_faster(text)
+            report[f"{output_format}{'_compact' if compact else ''}"] = len(output.encode("utf-8")) / n_words
+    output = BionicReading(output_format=OutputFormat.HTML.value, compact=True, **kwargs).read_faster(text)
+    for compression in Compression:
+        if compression == Compression.BROTLI and importlib.util.find_spec("brotli") is None:
+            continue
+        report[f"html_compact_{compression.value}"] = len(compress_string(output, compression.value)) / n_words
+
+    return report
+
+
+if __name__ == "__main__":
+    for name, size in output_size_report(read_text_file(sys.argv[1])).items():
+        print(f"{name:<24}{size:8.2f} bytes/word")
@@ -0,0 +1,61 @@
+import time
+import threading
+
+from collections import Counter
+from typing import Dict, Optional
+
+
+class Deadline:
+    """The end of the time budget of a call, checked cooperatively between the stages of the rendering."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        """
+        Inits Deadline
+
+        :param seconds: The time budget in seconds, None means no limit
+        :type seconds: float
+        """
+        self.end = None if seconds is None else time.perf_counter() + seconds
+
+    def expired(self) -> bool:
+        """
+        It checks whether the time budget is spent
+        :return: True if the deadline is over.
+        """
+        return self.end is not None and time.perf_counter() >= self.end
+
+
+class BudgetMetrics:
+    """Counts the calls and how often each budget was hit, shared by all the BionicReading of the process."""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str):
+        """
+        It increments a counter: calls, truncated, rare_words_skipped or timed_out
+
+        :param name: The name of the counter
+        :type name: str
+        """
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        It returns a copy of the counters
+        :return: The value of each counter.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        """
+        It sets all the counters back to 0
+        """
+        with self._lock:
+            self._counts.clear()
+
+
+BUDGET_METRICS = BudgetMetrics()
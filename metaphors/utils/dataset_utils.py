@@ -0,0 +1,304 @@
+import os
+import json
+import mmap
+import shutil
+import hashlib
+import inspect
+import functools
+import numpy as np
+import pandas as pd
+
+from typing import Any, Callable, Iterator, List
+
+from metaphors.settings import INTERIM_DATA_PATH
+
+
+SUCCESS_FILE = "_SUCCESS"
+PART_PREFIX = "part-"
+COLUMNS_FILE = "columns.json"
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """
+    It computes the sha256 of a file, block by block so the file is never fully loaded. A stage output directory is
+    hashed through its success marker, which already contains the key of the stage
+
+    :param path: The path of the file or of the stage output directory
+    :type path: str
+    :param block_size: The number of bytes read at once
+    :type block_size: int
+    :return: The hexadecimal digest.
+    """
+    assert os.path.exists(path), f"file {path} doesn't exists."
+    if os.path.isdir(path):
+        path = os.path.join(path, SUCCESS_FILE)
+        assert os.path.exists(path), f"directory {path} is not a completed stage output."
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def hash_transform(transform: Callable) -> str:
+    """
+    It computes the sha256 of the source code of a transform. Only the transform itself is hashed, not the helpers it
+    calls: bump the `version` of the stage when a helper changes. A partial is hashed as its function and its bound
+    arguments, a callable object as the source of its class, and a callable without source code as its bytecode, or
+    its repr as a last resort
+
+    :param transform: The function applied by a stage
+    :type transform: Callable
+    :return: The hexadecimal digest.
+    """
+    if isinstance(transform, functools.partial):
+        bound = repr((transform.args, sorted(transform.keywords.items())))
+        return hashlib.sha256((hash_transform(transform.func) + bound).encode("utf-8")).hexdigest()
+    code = None
+    for source in (transform, type(transform)):
+        try:
+            code = inspect.getsource(source).encode("utf-8")
+            break
+        except (OSError, TypeError):
+            continue
+    if code is None:
+        code = transform.__code__.co_code if hasattr(transform, "__code__") else repr(transform).encode("utf-8")
+
+    return hashlib.sha256(code).hexdigest()
+
+
+def _write_values(prefix: str, encoded: List[bytes], nulls: np.ndarray):
+    """
+    It writes variable-length values concatenated in a .utf8 file, with their offsets and null mask as .npy files
+
+    :param prefix: The path of the column without extension
+    :type prefix: str
+    :param encoded: The encoded values, empty for the nulls
+    :type encoded: List[bytes]
+    :param nulls: The null mask of the column
+    :type nulls: np.ndarray
+    """
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    with open(f"{prefix}.utf8", "wb") as file:
+        file.write(b"".join(encoded))
+    np.save(f"{prefix}.offsets.npy", offsets, allow_pickle=False)
+    np.save(f"{prefix}.nulls.npy", nulls.astype(bool), allow_pickle=False)
+
+
+def write_columns(directory: str, data: pd.DataFrame):
+    """
+    It writes each column of the dataframe so it can be memory-mapped by `read_columns`, with its kind in columns.json:
+    - array: a numpy column, as a .npy file
+    - masked: a nullable extension column (Int64, boolean, Float64...), as its numpy values and null mask .npy files
+    - text: an object column of strings, the utf-8 values concatenated in a .utf8 file with their offsets and null mask
+    as .npy files, so a long value doesn't inflate the other rows
+    - json: an object column holding other values (lists, dicts, numbers...), stored like a text column with each value
+    encoded in JSON, a value which can't be encoded in JSON raises a TypeError instead of being changed silently
+
+    :param directory: The directory to write the columns into
+    :type directory: str
+    :param data: The data to write
+    :type data: pd.DataFrame
+    """
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    for index, column in enumerate(data.columns):
+        series = data[column]
+        prefix = os.path.join(directory, f"{index:04d}")
+        description = {"name": str(column), "dtype": str(series.dtype)}
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and hasattr(series.dtype, "numpy_dtype"):
+            values = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+            np.save(f"{prefix}.npy", values, allow_pickle=False)
+            np.save(f"{prefix}.nulls.npy", series.isna().to_numpy(), allow_pickle=False)
+            columns.append({**description, "kind": "masked"})
+            continue
+        values = series.to_numpy()
+        if values.dtype != object:
+            np.save(f"{prefix}.npy", values, allow_pickle=False)
+            columns.append({**description, "kind": "array"})
+            continue
+        nulls = pd.isna(values)
+        if all(null or isinstance(value, str) for value, null in zip(values, nulls)):
+            encoded = [b"" if null else value.encode("utf-8") for value, null in zip(values, nulls)]
+            columns.append({**description, "kind": "text"})
+        else:
+            encoded = [b"" if null else json.dumps(value).encode("utf-8") for value, null in zip(values, nulls)]
+            columns.append({**description, "kind": "json"})
+        _write_values(prefix, encoded, nulls)
+    with open(os.path.join(directory, COLUMNS_FILE), "w") as file:
+        json.dump(columns, file)
+
+
+def read_columns(directory: str) -> pd.DataFrame:
+    """
+    It reads the columns written by `write_columns`. The numeric columns are memory-mapped and not loaded, the text
+    and json columns are decoded from their memory-mapped file, so only the values of this part are loaded. The nulls
+    are read back as None, or as NA for the nullable extension columns
+
+    :param directory: The directory containing the columns
+    :type directory: str
+    :return: A dataframe of the columns.
+    """
+    assert os.path.isdir(directory), f"directory {directory} doesn't exists."
+    with open(os.path.join(directory, COLUMNS_FILE), "r") as file:
+        kinds = json.load(file)
+    columns = {}
+    for index, column in enumerate(kinds):
+        prefix = os.path.join(directory, f"{index:04d}")
+        if column["kind"] == "array":
+            columns[column["name"]] = np.load(f"{prefix}.npy", mmap_mode="r", allow_pickle=False)
+            continue
+        nulls = np.load(f"{prefix}.nulls.npy", mmap_mode="r", allow_pickle=False)
+        if column["kind"] == "masked":
+            dtype = pd.api.types.pandas_dtype(column["dtype"])
+            values = np.load(f"{prefix}.npy", mmap_mode="r", allow_pickle=False)
+            columns[column["name"]] = pd.Series(dtype.construct_array_type()(np.asarray(values), np.asarray(nulls)))
+            continue
+        decode = json.loads if column["kind"] == "json" else bytes.decode
+        offsets = np.load(f"{prefix}.offsets.npy", mmap_mode="r", allow_pickle=False)
+        with open(f"{prefix}.utf8", "rb") as file:
+            blob = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+        series = pd.Series(
+            [None if nulls[row] else decode(blob[offsets[row] : offsets[row + 1]]) for row in range(len(nulls))],
+            dtype=object,
+        )
+        # e.g. a category or string column, written as its values
+        columns[column["name"]] = (
+            series if column.get("dtype", "object") == "object" else series.astype(column["dtype"])
+        )
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def iter_chunks(path: str, chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+    """
+    It streams a JSONL, CSV or Parquet file, or the output of a stage, as dataframes of at most `chunk_size` rows
+
+    :param path: The path of the file or of the stage output directory
+    :type path: str
+    :param chunk_size: The maximum number of rows of a chunk
+    :type chunk_size: int
+    :return: An iterator of dataframes.
+    """
+    assert os.path.exists(path), f"file {path} doesn't exists."
+    if os.path.isdir(path):
+        for part in sorted(os.listdir(path)):
+            if part.startswith(PART_PREFIX):
+                yield read_columns(os.path.join(path, part))
+    elif path.endswith(".jsonl"):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    elif path.endswith(".csv"):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"please use a .jsonl, .csv or .parquet file, got {path}")
+
+
+class Stage:
+    """
+    A preprocessing step applied chunk by chunk to its inputs. The output is cached under a key made of the content of
+    the inputs, the code of the transform and its parameters, so running an unchanged stage again does nothing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        transform: Callable[..., pd.DataFrame],
+        output_path: str = INTERIM_DATA_PATH,
+        chunk_size: int = 10000,
+        version: str = "",
+        **params: Any,
+    ):
+        """
+        Inits Stage
+
+        :param name: The name of the stage, used as prefix of its output directory
+        :type name: str
+        :param transform: The function applied to each chunk, called as `transform(chunk, **params)`
+        :type transform: Callable[..., pd.DataFrame]
+        :param output_path: The directory where the stage outputs are written, defaults to INTERIM_DATA_PATH
+        :type output_path: str
+        :param chunk_size: The maximum number of rows given at once to the transform
+        :type chunk_size: int
+        :param version: Part of the cache key, to bump when a helper called by the transform changes
+        :type version: str
+        :param params: The parameters of the transform, they are part of the cache key so must be json serializable
+        :type params: Any
+        """
+        assert chunk_size > 0, "please enter a chunk_size greater than 0"
+        self.name = name
+        self.transform = transform
+        self.output_path = output_path
+        self.chunk_size = chunk_size
+        self.version = version
+        self.params = params
+
+    def key(self, inputs: List[str]) -> str:
+        """
+        It computes the cache key of the stage for the given inputs
+
+        :param inputs: The paths of the input files or stage outputs
+        :type inputs: List[str]
+        :return: The hexadecimal key.
+        """
+        digest = hashlib.sha256()
+        for path in inputs:
+            digest.update(hash_file(path).encode("utf-8"))
+        digest.update(hash_transform(self.transform).encode("utf-8"))
+        digest.update(self.version.encode("utf-8"))
+        digest.update(json.dumps(self.params, sort_keys=True).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def run(self, inputs: List[str]) -> str:
+        """
+        It applies the transform to every chunk of the inputs and writes one memory-mappable part per chunk, unless the
+        output of the same key already exists. The parts are written in a temporary directory which is renamed once
+        complete, so an interrupted run never leaves a partial output behind
+
+        :param inputs: The paths of the input files or stage outputs
+        :type inputs: List[str]
+        :return: The path of the output directory, readable with `iter_chunks`.
+        """
+        key = self.key(inputs)
+        output = os.path.join(self.output_path, f"{self.name}-{key[:16]}")
+        if os.path.exists(os.path.join(output, SUCCESS_FILE)):
+            return output
+        temporary = f"{output}.tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        n_parts = 0
+        for path in inputs:
+            for chunk in iter_chunks(path, self.chunk_size):
+                write_columns(
+                    os.path.join(temporary, f"{PART_PREFIX}{n_parts:05d}"), self.transform(chunk, **self.params)
+                )
+                n_parts += 1
+        with open(os.path.join(temporary, SUCCESS_FILE), "w") as file:
+            file.write(key)
+        shutil.rmtree(output, ignore_errors=True)
+        os.replace(temporary, output)
+
+        return output
+
+
+def run_pipeline(stages: List[Stage], inputs: List[str]) -> str:
+    """
+    It runs the stages one after the other, each one reading the output of the previous one
+
+    :param stages: The stages to run, in order
+    :type stages: List[Stage]
+    :param inputs: The paths of the inputs of the first stage
+    :type inputs: List[str]
+    :return: The path of the output of the last stage.
+    """
+    for stage in stages:
+        inputs = [stage.run(inputs)]
+
+    return inputs[0]
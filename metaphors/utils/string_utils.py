@@ -1,4 +1,6 @@
 import re
+import gzip
+import importlib
 
 
 def string_contains_digit(string: str) -> bool:
@@ -25,3 +27,22 @@ def strike_string(string: str) -> str:
     :return: A string with the characters in the string argument struck through.
     """
     return "".join(["{}\u0336".format(c) for c in string])
+
+
+def compress_string(string: str, compression: str = "gzip") -> bytes:
+    """
+    It encodes the string in utf-8 and compresses it, so it can be served as is with the matching Content-Encoding
+
+    :param string: The string to compress
+    :type string: str
+    :param compression: The compression algorithm, "gzip" or "br" (needs the brotli package), defaults to "gzip"
+    :type compression: str (optional)
+    :return: The compressed bytes.
+    """
+    data = string.encode("utf-8")
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    elif compression == "br":
+        return importlib.import_module("brotli").compress(data)
+    else:
+        raise ValueError(f"please use a gzip or br compression, got {compression}")
@@ -0,0 +1,83 @@
+import os
+import json
+import tempfile
+import functools
+import unittest
+import numpy as np
+import pandas as pd
+
+from metaphors.utils.dataset_utils import Stage, iter_chunks, read_columns, run_pipeline, write_columns
+
+
+def add_length(chunk: pd.DataFrame) -> pd.DataFrame:
+    return chunk.assign(length=chunk["text"].str.len())
+
+
+def keep_long(chunk: pd.DataFrame, min_length: int) -> pd.DataFrame:
+    return chunk[chunk["length"] >= min_length]
+
+
+class TestDatasetUtils(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "raw.jsonl")
+        with open(self.path, "w") as file:
+            for text in ["a", "bionic", "reading", "is", "fast"]:
+                file.write(json.dumps({"text": text}) + "\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_chunks(self):
+        self.assertEqual([len(chunk) for chunk in iter_chunks(self.path, chunk_size=2)], [2, 2, 1])
+
+    def test_pipeline_is_cached(self):
+        stages = [
+            Stage("length", add_length, output_path=self.directory.name, chunk_size=2),
+            Stage("long", keep_long, output_path=self.directory.name, chunk_size=2, min_length=4),
+        ]
+        output = run_pipeline(stages, [self.path])
+        data = pd.concat(iter_chunks(output))
+        self.assertEqual(data["text"].tolist(), ["bionic", "reading", "fast"])
+        self.assertIsInstance(next(iter_chunks(output))["length"].to_numpy().base, np.memmap)
+        modified = os.path.getmtime(output)
+        self.assertEqual(run_pipeline(stages, [self.path]), output)
+        self.assertEqual(os.path.getmtime(output), modified)
+        stages[1].params["min_length"] = 6
+        self.assertNotEqual(run_pipeline(stages, [self.path]), output)
+
+    def test_text_columns(self):
+        directory = os.path.join(self.directory.name, "part")
+        data = pd.DataFrame({"text": ["a" * 100000] + ["b"] * 99 + [None], "length": np.arange(101)})
+        write_columns(directory, data)
+        self.assertLess(sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)), 110000)
+        loaded = read_columns(directory)
+        self.assertEqual(loaded["text"].tolist(), data["text"].tolist())
+        self.assertIsNone(loaded["text"].iloc[-1])
+        self.assertIsInstance(loaded["length"].to_numpy().base, np.memmap)
+
+    def test_typed_columns(self):
+        directory = os.path.join(self.directory.name, "part")
+        data = pd.DataFrame(
+            {
+                "tags": [["a", "b"], None, {"c": 1}],
+                "flag": pd.array([True, None, False], dtype="boolean"),
+                "count": pd.array([1, None, 3], dtype="Int64"),
+                "label": pd.Series(["x", "y", "x"], dtype="category"),
+            }
+        )
+        write_columns(directory, data)
+        loaded = read_columns(directory)
+        self.assertEqual(loaded["tags"].tolist(), [["a", "b"], None, {"c": 1}])
+        for column in ["flag", "count", "label"]:
+            self.assertEqual(loaded[column].dtype, data[column].dtype)
+            pd.testing.assert_series_equal(loaded[column], data[column])
+        with self.assertRaises(TypeError):
+            write_columns(directory, pd.DataFrame({"value": [object()]}))
+
+    def test_stage_key(self):
+        stage = Stage("long", functools.partial(keep_long, min_length=4), output_path=self.directory.name)
+        key = stage.key([self.path])
+        self.assertNotEqual(Stage("long", functools.partial(keep_long, min_length=5)).key([self.path]), key)
+        stage.version = "2"
+        self.assertNotEqual(stage.key([self.path]), key)
@@ -0,0 +1,88 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from metaphors.utils.logger import MetricsLogger, Sink, JsonlSink, SqliteSink, WandbSink, wandb_logger
+
+
+class StalledSink(Sink):
+    def __init__(self):
+        self.release = threading.Event()
+
+    def write(self, records):
+        self.release.wait()
+
+
+class FakeRun:
+    def __init__(self):
+        self.calls = []
+
+    def log(self, metrics, step=None):
+        self.calls.append((metrics, step))
+
+
+class TestMetricsLogger(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_offline_sinks(self):
+        jsonl_path = os.path.join(self.directory.name, "metrics.jsonl")
+        sqlite_path = os.path.join(self.directory.name, "metrics.db")
+        with MetricsLogger([JsonlSink(jsonl_path), SqliteSink(sqlite_path)], batch_size=2) as metrics_logger:
+            metrics_logger.log("loss", 0.5, step=0)
+            metrics_logger.log_metrics({"loss": 0.25, "accuracy": 0.75}, step=1)
+        with open(jsonl_path) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(
+            [(record["name"], record["step"]) for record in records], [("loss", 0), ("loss", 1), ("accuracy", 1)]
+        )
+        with sqlite3.connect(sqlite_path) as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM metrics").fetchone()[0], 3)
+
+    def test_disabled_sink(self):
+        self.assertIsNone(wandb_logger(enabled=False))
+        with MetricsLogger([None]) as metrics_logger:
+            metrics_logger.log("loss", 0.5)
+        self.assertEqual(metrics_logger.sinks, [])
+
+    def test_stalled_sink(self):
+        jsonl_path = os.path.join(self.directory.name, "metrics.jsonl")
+        stalled = StalledSink()
+        metrics_logger = MetricsLogger([stalled, JsonlSink(jsonl_path)], flush_interval=0.01, max_queue_size=2)
+        for step in range(10):
+            metrics_logger.log("loss", 0.5, step=step)
+        metrics_logger.close(timeout=0.5)
+        stalled.release.set()
+        with open(jsonl_path) as file:
+            self.assertGreater(len(file.readlines()), 0)
+        self.assertGreater(metrics_logger.dropped[0], 0)
+        self.assertEqual(len(metrics_logger.dropped), 2)
+        with self.assertRaises(AssertionError):
+            metrics_logger.log("loss", 0.5)
+
+    def test_abstract_sink(self):
+        with self.assertRaises(TypeError):
+            Sink()
+
+    def test_wandb_sink_groups_steps(self):
+        run = FakeRun()
+        sink = WandbSink(module=None)
+        sink._run = run
+        with MetricsLogger([sink]) as metrics_logger:
+            metrics_logger.log_metrics({"loss": 0.5, "accuracy": 0.75})
+            metrics_logger.log("loss", 0.25)
+            metrics_logger.log_metrics({"loss": 0.125, "accuracy": 0.875}, step=2)
+        self.assertEqual(
+            run.calls,
+            [
+                ({"loss": 0.5, "accuracy": 0.75}, None),
+                ({"loss": 0.25}, None),
+                ({"loss": 0.125, "accuracy": 0.875}, 2),
+            ],
+        )
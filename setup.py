@@ -9,4 +9,9 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     zip_safe=False,
+    entry_points={
+        "console_scripts": [
+            "metaphors-bionic=metaphors.applications.bionic_reading.etl.bulk_rendering:main",
+        ],
+    },
 )